@@ -0,0 +1,940 @@
+"""Preparação e análise dos dados criminais de SP, sem dependências de interface
+
+Módulo usado pelo dashboard (dashboard_crimes_sp.py) e importável em scripts, notebooks
+e jobs em lote: depende apenas de pandas e numpy (pyarrow só ao ler/gravar snapshots).
+
+    from analise_crimes_sp import load_prepared_data, generate_insights
+    df = load_prepared_data()
+    insights = generate_insights(df)
+"""
+import functools
+import hashlib
+import json
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+# --- Instrumentação ---
+# Ganchos opcionais registrados por quem consome o módulo: o dashboard registra seu
+# perfilador e o memo de agregados compartilhado entre sessões. Sem registro, as funções
+# rodam sem medição e sem memo.
+_hooks = {'section_timer': None, 'aggregate_memo': None}
+
+def set_section_timer(timer):
+    """Registra timer(name, kind, rows_in), gerenciador de contexto usado por @profiled"""
+    _hooks['section_timer'] = timer
+
+def set_aggregate_memo(memo):
+    """Registra memo(slice_key, name, params, compute), usado por memo_aggregate"""
+    _hooks['aggregate_memo'] = memo
+
+def process_rss():
+    """Memória residente do processo em bytes (None fora do Linux)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+def row_count(value):
+    """Linhas de um DataFrame/Series (ou do primeiro em uma tupla), tamanho de listas"""
+    if isinstance(value, tuple):
+        value = next((item for item in value if isinstance(item, (pd.DataFrame, pd.Series))), None)
+    if isinstance(value, (pd.DataFrame, pd.Series, list)):
+        return len(value)
+    return None
+
+def profiled(kind):
+    """Decorador: mede a função com o timer registrado (linhas = primeiro DataFrame dos argumentos)"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timer = _hooks['section_timer']
+            if timer is None:
+                return func(*args, **kwargs)
+            rows_in = next((len(arg) for arg in args if isinstance(arg, pd.DataFrame)), None)
+            with timer(func.__name__, kind, rows_in) as section:
+                result = func(*args, **kwargs)
+                section['rows_out'] = row_count(result)
+            return result
+        return wrapper
+    return decorate
+
+def memo_aggregate(filter_slice, name, compute, **params):
+    """Retorna o agregado memoizado para a fatia, calculando-o com compute() na primeira vez"""
+    memo = _hooks['aggregate_memo']
+    if filter_slice is None or memo is None:
+        return compute()
+    return memo(filter_slice['key'], name, tuple(sorted(params.items())), compute)
+
+# --- Carrega e prepara os dados ---
+DATA_PATH = 'dados_criminais_limpos.csv'
+
+# Tabelas de regras usadas por categorize_crime, categorize_location e simplify_delegacia
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regras_classificacao.json')
+
+# Snapshot colunar (Parquet) do conjunto já preparado
+SNAPSHOT_DIR = '.cache'
+
+# Versão da derivação: incrementar sempre que prepare_data mudar colunas ou tipos,
+# para invalidar os snapshots gravados com a lógica anterior
+DERIVATION_VERSION = 5
+
+def source_fingerprint(*paths):
+    """Gera a impressão digital das fontes (tamanho, mtime) e da versão da derivação"""
+    parts = [f"v{DERIVATION_VERSION}"]
+    for path in paths:
+        stat = os.stat(path)
+        parts.append(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+def snapshot_path(path, fingerprint):
+    """Caminho do snapshot Parquet correspondente à impressão digital da fonte"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(SNAPSHOT_DIR, f"{stem}.{fingerprint}.parquet")
+
+def read_snapshot(path):
+    """Lê o snapshot colunar, retornando None se ausente ou ilegível"""
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except (ImportError, OSError, ValueError):
+        return None
+
+def write_snapshot(df, path):
+    """Grava o snapshot de forma atômica e remove snapshots antigos da mesma fonte"""
+    directory, name = os.path.split(path)
+    stem = name.split('.', 1)[0]
+    try:
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except (ImportError, OSError, ValueError, TypeError):
+        # Sem pyarrow ou sem permissão de escrita: segue sem snapshot
+        return False
+    
+    for old in os.listdir(directory):
+        if old.startswith(f"{stem}.") and old.endswith('.parquet') and old != name:
+            try:
+                os.remove(os.path.join(directory, old))
+            except OSError:
+                pass
+    return True
+
+def dataset_version(data_path=DATA_PATH):
+    """Versão do conjunto preparado: muda quando o CSV, as regras ou a derivação mudam"""
+    # As regras de classificação também alimentam colunas derivadas
+    return source_fingerprint(data_path, RULES_PATH)
+
+def load_prepared_data(data_path=DATA_PATH):
+    """Carrega os dados preparados do snapshot, reconstruindo-o apenas se a fonte mudar"""
+    fingerprint = dataset_version(data_path)
+    path = snapshot_path(data_path, fingerprint)
+    df = read_snapshot(path)
+    if df is not None:
+        return df
+    
+    df = prepare_data(pd.read_csv(data_path))
+    write_snapshot(df, path)
+    return df
+
+def prepare_data(df):
+    """Converte tipos e cria as colunas derivadas a partir do CSV bruto"""
+    # Converte datas
+    df['DATA_REGISTRO'] = pd.to_datetime(df['DATA_REGISTRO'], dayfirst=True, errors='coerce')
+    df['DATA_OCORRENCIA_BO'] = pd.to_datetime(df['DATA_OCORRENCIA_BO'], errors='coerce')
+    
+    # Componentes temporais (hora, período, turno, dia da semana, mês/ano)
+    df = derive_temporal_features(df)
+    
+    # Colunas de texto
+    text_columns = [
+        'DESCR_SUBTIPOLOCAL', 'BAIRRO', 'LOGRADOURO', 'NUMERO_LOGRADOURO',
+        'NOME_DELEGACIA_CIRCUNSCRIÇÃO', 'NOME_MUNICIPIO_CIRCUNSCRIÇÃO',
+        'RUBRICA', 'DESCR_CONDUTA', 'NATUREZA_APURADA', 'MES_ANO'
+    ]
+    
+    for col in text_columns:
+        if col in df.columns:
+            df[col] = df[col].fillna('Não informado').astype(str)
+    
+    rules = load_classification_rules()
+    
+    # Categoriza tipos de crimes
+    df['CATEGORIA_CRIME'] = classify_series(df['NATUREZA_APURADA'], rules['categoria_crime'])
+    
+    # Categoriza locais
+    df['TIPO_LOCAL'] = classify_series(df['DESCR_SUBTIPOLOCAL'], rules['tipo_local'])
+    
+    # Calcula tempo entre ocorrência e registro
+    df['DIAS_ATE_REGISTRO'] = (df['DATA_REGISTRO'] - df['DATA_OCORRENCIA_BO']).dt.days
+    
+    # Identifica registros com coordenadas válidas
+    df['TEM_COORDENADAS'] = (~df['LATITUDE'].isna() & ~df['LONGITUDE'].isna() & 
+                            (df['LATITUDE'] != 0) & (df['LONGITUDE'] != 0))
+    
+    # Cria campo para delegacia simplificada (remove prefixos comuns)
+    df['DELEGACIA_SIMPLES'] = map_unique(
+        df['NOME_DELEGACIA_CIRCUNSCRIÇÃO'], lambda d: rules['delegacia'].sub('', d)
+    )
+    
+    # Dimensões como categóricas e numéricos reduzidos conforme o esquema
+    df = apply_schema(df)
+    
+    # Endereço completo como id inteiro (códigos) com o rótulo formatado uma vez por id
+    df['ENDERECO'] = address_index(df)
+    return df
+
+# --- Atributos temporais ---
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+PERIODOS_DIA = ['Manhã (5h-12h)', 'Tarde (12h-18h)', 'Noite (18h-22h)', 'Madrugada (22h-5h)', 'Desconhecido']
+TURNOS = ['Diurno (6h-18h)', 'Noturno (18h-6h)', 'Desconhecido']
+TIPOS_DIA = ['Dia de Semana', 'Fim de Semana', 'Desconhecido']
+
+# Tabelas de corte: código do rótulo para cada hora 0-23; a posição 24 representa hora ausente
+PERIODO_POR_HORA = np.array([3] * 5 + [0] * 7 + [1] * 6 + [2] * 4 + [3] * 2 + [4], dtype=np.int8)
+TURNO_POR_HORA = np.array([1] * 6 + [0] * 12 + [1] * 6 + [2], dtype=np.int8)
+# Código do tipo de dia para cada dia da semana 0-6; a posição 7 representa data ausente
+TIPO_DIA_POR_DIA = np.array([0] * 5 + [1] * 2 + [2], dtype=np.int8)
+
+def categorize_period(hour):
+    if pd.isna(hour):
+        return "Desconhecido"
+    return PERIODOS_DIA[PERIODO_POR_HORA[int(hour)]]
+
+def parse_hour(series):
+    """Extrai a hora de textos HH:MM:SS, convertendo apenas os valores distintos"""
+    codes, uniques = pd.factorize(series)
+    hours = pd.to_datetime(pd.Series(uniques, dtype=object), format='%H:%M:%S', errors='coerce').dt.hour
+    # O último elemento atende aos códigos -1 (valores ausentes)
+    return np.append(hours.to_numpy(dtype=float), np.nan)[codes]
+
+def month_key_labels(keys, fmt):
+    """Formata chaves inteiras AAAAMM uma vez por valor distinto"""
+    return map_unique(keys, lambda key: pd.Timestamp(year=int(key) // 100, month=int(key) % 100, day=1).strftime(fmt))
+
+def derive_temporal_features(df):
+    """Deriva os atributos temporais de forma vetorizada, uma única vez na carga"""
+    ocorrencia = df['DATA_OCORRENCIA_BO'].dt
+    registro = df['DATA_REGISTRO'].dt
+    
+    df['ANO_REGISTRO'] = registro.year
+    df['MES_REGISTRO'] = registro.month
+    df['ANO_OCORRENCIA'] = ocorrencia.year
+    df['MES_OCORRENCIA'] = ocorrencia.month
+    
+    # Dia da semana como código (0 = segunda) e nome em inglês
+    weekday = ocorrencia.weekday.to_numpy(dtype=float)
+    weekday_idx = np.where(np.isnan(weekday), 7, weekday).astype(np.intp)
+    df['DIA_SEMANA_NUM'] = weekday
+    df['DIA_SEMANA'] = np.array(WEEKDAY_NAMES + [np.nan], dtype=object)[weekday_idx]
+    df['FIM_DE_SEMANA'] = np.array(TIPOS_DIA, dtype=object)[TIPO_DIA_POR_DIA[weekday_idx]]
+    
+    # Hora do dia e faixas horárias via tabelas de corte
+    hour = parse_hour(df['HORA_OCORRENCIA_BO'])
+    hour_idx = np.where(np.isnan(hour), 24, hour).astype(np.intp)
+    df['HORA_DIA'] = hour
+    df['PERIODO_DIA'] = np.array(PERIODOS_DIA, dtype=object)[PERIODO_POR_HORA[hour_idx]]
+    df['TURNO'] = np.array(TURNOS, dtype=object)[TURNO_POR_HORA[hour_idx]]
+    
+    # Chaves inteiras de mês (AAAAMM) e rótulos de exibição
+    df['CHAVE_MES_OCORRENCIA'] = df['ANO_OCORRENCIA'] * 100 + df['MES_OCORRENCIA']
+    df['CHAVE_MES_REGISTRO'] = df['ANO_REGISTRO'] * 100 + df['MES_REGISTRO']
+    df['ANO_MES_OCORRENCIA'] = month_key_labels(df['CHAVE_MES_OCORRENCIA'], '%Y-%m')
+    df['MES_ANO_FORMATADO'] = month_key_labels(df['CHAVE_MES_OCORRENCIA'], '%b/%Y')
+    df['MES_ANO_REGISTRO_FORMATADO'] = month_key_labels(df['CHAVE_MES_REGISTRO'], '%b/%Y')
+    
+    return df
+
+# --- Esquema de tipos do conjunto preparado ---
+# Dimensões de texto armazenadas como categóricas (dicionário + códigos inteiros)
+CATEGORICAL_COLUMNS = [
+    'DESCR_SUBTIPOLOCAL', 'BAIRRO', 'LOGRADOURO', 'NUMERO_LOGRADOURO',
+    'NOME_DELEGACIA_CIRCUNSCRIÇÃO', 'NOME_MUNICIPIO_CIRCUNSCRIÇÃO',
+    'RUBRICA', 'DESCR_CONDUTA', 'NATUREZA_APURADA', 'MES_ANO', 'HORA_OCORRENCIA_BO',
+    'CATEGORIA_CRIME', 'TIPO_LOCAL', 'DELEGACIA_SIMPLES', 'DIA_SEMANA', 'PERIODO_DIA',
+    'TURNO', 'FIM_DE_SEMANA', 'ANO_MES_OCORRENCIA', 'MES_ANO_FORMATADO', 'MES_ANO_REGISTRO_FORMATADO'
+]
+
+# Colunas numéricas reduzidas (tipos inteiros anuláveis onde há valores ausentes)
+NUMERIC_SCHEMA = {
+    'LATITUDE': 'float32',
+    'LONGITUDE': 'float32',
+    'HORA_DIA': 'Int8',
+    'DIA_SEMANA_NUM': 'Int8',
+    'ANO_REGISTRO': 'Int16',
+    'MES_REGISTRO': 'Int8',
+    'ANO_OCORRENCIA': 'Int16',
+    'MES_OCORRENCIA': 'Int8',
+    'CHAVE_MES_OCORRENCIA': 'Int32',
+    'CHAVE_MES_REGISTRO': 'Int32',
+    'DIAS_ATE_REGISTRO': 'Int32'
+}
+
+def declared_categories():
+    """Conjuntos fixos de rótulos das dimensões derivadas (independem dos dados)"""
+    rules = load_classification_rules()
+    return {
+        'CATEGORIA_CRIME': [label for label, _ in rules['categoria_crime'][0]] + [rules['categoria_crime'][1]],
+        'TIPO_LOCAL': [label for label, _ in rules['tipo_local'][0]] + [rules['tipo_local'][1]],
+        'DIA_SEMANA': WEEKDAY_NAMES,
+        'PERIODO_DIA': PERIODOS_DIA,
+        'TURNO': TURNOS,
+        'FIM_DE_SEMANA': TIPOS_DIA
+    }
+
+def apply_schema(df):
+    """Converte as colunas para os tipos declarados, com categorias em ordem alfabética estável"""
+    declared = declared_categories()
+    
+    for col in CATEGORICAL_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = declared.get(col)
+        if values is None:
+            values = pd.unique(df[col].dropna())
+        df[col] = pd.Categorical(df[col], categories=sorted(values))
+    
+    for col, dtype in NUMERIC_SCHEMA.items():
+        if col in df.columns:
+            df[col] = df[col].astype(dtype)
+    
+    return df
+
+def object_layout_bytes(series):
+    """Estima os bytes da coluna no layout sem esquema (texto como object, numéricos em 64 bits)"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Posição 0 = valor ausente (código -1), demais = categorias
+        sizes = np.array([sys.getsizeof(np.nan)] + [sys.getsizeof(value) for value in series.cat.categories])
+        counts = np.bincount(series.cat.codes.to_numpy().astype(np.intp) + 1, minlength=len(sizes))
+        # Um ponteiro por linha mais o objeto referenciado
+        return len(series) * 8 + int((counts * sizes).sum())
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        return len(series) * 8
+    return int(series.memory_usage(deep=True, index=False))
+
+def memory_report(df):
+    """Relatório de bytes por coluna antes (sem esquema) e depois (tipos declarados)"""
+    report = pd.DataFrame({
+        'Coluna': df.columns,
+        'Tipo': [str(dtype) for dtype in df.dtypes],
+        'Bytes antes': [object_layout_bytes(df[col]) for col in df.columns],
+        'Bytes depois': [int(df[col].memory_usage(deep=True, index=False)) for col in df.columns]
+    })
+    report = report.sort_values('Bytes antes', ascending=False)
+    totals = pd.DataFrame([{
+        'Coluna': 'Total', 'Tipo': '',
+        'Bytes antes': report['Bytes antes'].sum(), 'Bytes depois': report['Bytes depois'].sum()
+    }])
+    report = pd.concat([report, totals], ignore_index=True)
+    report['Redução (%)'] = (1 - report['Bytes depois'] / report['Bytes antes'].where(report['Bytes antes'] > 0)) * 100
+    return report
+
+# --- Índice de endereços ---
+ADDRESS_COLUMNS = ['NOME_MUNICIPIO_CIRCUNSCRIÇÃO', 'BAIRRO', 'LOGRADOURO', 'NUMERO_LOGRADOURO']
+
+def address_index(df):
+    """Categórica de endereços: código = id do endereço, categoria = 'LOGRADOURO, NUMERO, BAIRRO, MUNICIPIO'
+    
+    Os ids seguem a ordem de (município, bairro, logradouro, número), como num groupby, e o
+    rótulo é formatado só para os endereços distintos.
+    """
+    ids = df.groupby(ADDRESS_COLUMNS, observed=True, sort=True).ngroup().to_numpy()
+    valid = ids >= 0
+    _, first_rows = np.unique(ids[valid], return_index=True)
+    keys = df.loc[valid, ADDRESS_COLUMNS].iloc[first_rows].astype(str)
+    labels = (
+        keys['LOGRADOURO'] + ', ' + keys['NUMERO_LOGRADOURO'] + ', ' +
+        keys['BAIRRO'] + ', ' + keys['NOME_MUNICIPIO_CIRCUNSCRIÇÃO']
+    )
+    # Endereços distintos com o mesmo rótulo compartilham o id
+    label_codes, label_values = pd.factorize(labels.to_numpy())
+    codes = np.full(len(df), -1, dtype=np.int32)
+    codes[valid] = label_codes[ids[valid]]
+    return pd.Categorical.from_codes(codes, categories=label_values)
+
+# --- Motor de classificação por regras ---
+def compile_rule_table(table):
+    """Compila uma tabela de regras em (rótulo, regex multi-termo) na ordem de prioridade"""
+    compiled = [
+        (rule['rotulo'], re.compile('|'.join(re.escape(term.upper()) for term in rule['termos'])))
+        for rule in table['regras']
+    ]
+    return compiled, table['padrao']
+
+def load_classification_rules(path=RULES_PATH):
+    """Tabelas de classificação compiladas do arquivo de configuração
+    
+    O cache é chaveado por tamanho e mtime do arquivo (os mesmos de source_fingerprint): uma
+    edição das regras com o processo em execução é recompilada antes de reconstruir o snapshot.
+    """
+    stat = os.stat(path)
+    return compiled_classification_rules(path, stat.st_size, stat.st_mtime_ns)
+
+@functools.lru_cache(maxsize=4)
+def compiled_classification_rules(path, size, mtime_ns):
+    # size e mtime_ns só participam da chave do cache
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    
+    return {
+        'categoria_crime': compile_rule_table(config['categoria_crime']),
+        'tipo_local': compile_rule_table(config['tipo_local']),
+        'delegacia': re.compile(config['delegacia']['remover_prefixo'])
+    }
+
+def classify_text(text, rule_table):
+    """Retorna o rótulo da primeira regra com algum termo contido no texto"""
+    compiled, default = rule_table
+    text = text.upper()
+    for label, pattern in compiled:
+        if pattern.search(text):
+            return label
+    return default
+
+def map_unique(series, func):
+    """Aplica func uma vez por valor distinto e propaga o resultado pelos códigos"""
+    codes, uniques = pd.factorize(series)
+    # O último elemento atende aos códigos -1 (valores ausentes)
+    mapped = np.array([func(value) for value in uniques] + [np.nan], dtype=object)
+    return pd.Series(mapped[codes], index=series.index, name=series.name)
+
+def classify_series(series, rule_table):
+    """Classifica uma coluna avaliando as regras apenas nos valores distintos"""
+    return map_unique(series, lambda value: classify_text(value, rule_table))
+
+def categorize_crime(crime):
+    return classify_text(crime, load_classification_rules()['categoria_crime'])
+
+def categorize_location(location):
+    return classify_text(location, load_classification_rules()['tipo_local'])
+
+def simplify_delegacia(delegacia):
+    # Remove prefixos comuns como "DEL.POL." ou "01º D.P."
+    return load_classification_rules()['delegacia'].sub('', delegacia)
+
+# --- Índice invertido para filtros ---
+# Dimensões filtráveis pela barra lateral
+FILTER_COLUMNS = [
+    'ANO_REGISTRO', 'MES_REGISTRO', 'PERIODO_DIA', 'DIA_SEMANA',
+    'NOME_MUNICIPIO_CIRCUNSCRIÇÃO', 'BAIRRO', 'DELEGACIA_SIMPLES', 'TIPO_LOCAL',
+    'CATEGORIA_CRIME', 'NATUREZA_APURADA', 'RUBRICA', 'DESCR_CONDUTA'
+]
+
+def dimension_codes(series):
+    """Códigos inteiros (-1 = ausente) e valores ordenados de uma dimensão"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy().astype(np.int32), series.cat.categories
+    codes, values = pd.factorize(series, sort=True)
+    return codes.astype(np.int32), pd.Index(values)
+
+def build_dimension_index(series):
+    """Lista de linhas por valor (layout CSR): códigos, linhas ordenadas por código e offsets"""
+    codes, values = dimension_codes(series)
+    # Deslocamento de +1 para que valores ausentes (código -1) ocupem a posição 0
+    counts = np.bincount(codes + 1, minlength=len(values) + 1)
+    return {
+        'values': values,
+        'codes': codes,
+        'rows': np.argsort(codes, kind='stable').astype(np.int32),
+        'offsets': np.concatenate([[0], np.cumsum(counts)]),
+        'counts': counts[1:]
+    }
+
+def build_filter_index(df, columns=FILTER_COLUMNS):
+    """Constrói o índice invertido de todas as dimensões filtráveis"""
+    return {
+        'n_rows': len(df),
+        'dims': {col: build_dimension_index(df[col]) for col in columns if col in df.columns}
+    }
+
+def selected_codes(dim, selected):
+    """Códigos dos valores selecionados que existem no índice"""
+    codes = dim['values'].get_indexer(pd.Index(list(selected)))
+    return np.unique(codes[codes >= 0])
+
+def resolve_filters(index, filters):
+    """Resolve o estado de filtros em ids de linha (OU dentro da dimensão, E entre dimensões)
+    
+    Retorna None quando nenhum filtro está ativo, ou seja, todas as linhas.
+    """
+    active = []
+    for col, selected in filters.items():
+        if selected:
+            dim = index['dims'][col]
+            active.append((dim, selected_codes(dim, selected)))
+    
+    if not active:
+        return None
+    
+    # Parte da dimensão mais seletiva e verifica as demais apenas nas linhas candidatas
+    active.sort(key=lambda item: int(item[0]['counts'][item[1]].sum()))
+    dim, codes = active[0]
+    rows = np.concatenate(
+        [dim['rows'][dim['offsets'][code + 1]:dim['offsets'][code + 2]] for code in codes]
+        or [np.empty(0, dtype=np.int32)]
+    )
+    rows.sort()
+    
+    for dim, codes in active[1:]:
+        if len(rows) == 0:
+            break
+        # Tabela de pertinência; a última posição atende aos ausentes (código -1)
+        member = np.zeros(len(dim['values']) + 1, dtype=bool)
+        member[codes] = True
+        rows = rows[member[dim['codes'][rows]]]
+    
+    return rows
+
+def take_rows(df, rows):
+    """Materializa as linhas com um único take (sem cópia quando rows é None)"""
+    if rows is None:
+        return df
+    return df.take(rows)
+
+def apply_filters(df, index, filters):
+    return take_rows(df, resolve_filters(index, filters))
+
+def dimension_counts(dim, rows):
+    """Linhas por valor da dimensão entre `rows` (None = todas), na ordem do índice"""
+    if rows is None:
+        return dim['counts']
+    return np.bincount(dim['codes'][rows] + 1, minlength=len(dim['values']) + 1)[1:]
+
+# --- Catálogo de opções dos filtros ---
+def observed_options(dim):
+    """Valores da dimensão com ao menos uma linha, na ordem (ordenada) do índice"""
+    return dim['values'][dim['counts'] > 0].tolist()
+
+def dependent_options(df, parent, child):
+    """Mapa valor de `parent` -> lista ordenada dos valores de `child` que ocorrem com ele"""
+    pairs = count_frame(df, [parent, child])
+    return {
+        key: group[child].tolist()
+        for key, group in pairs.groupby(parent, observed=True, sort=False)
+    }
+
+def build_filter_catalog(df, index):
+    """Listas de opções da barra lateral e mapas de dependência entre filtros"""
+    return {
+        'options': {col: observed_options(dim) for col, dim in index['dims'].items()},
+        'bairros_por_municipio': dependent_options(df, 'NOME_MUNICIPIO_CIRCUNSCRIÇÃO', 'BAIRRO'),
+        'naturezas_por_categoria': dependent_options(df, 'CATEGORIA_CRIME', 'NATUREZA_APURADA')
+    }
+
+def catalog_options(catalog, col, mapping=None, selected=None):
+    """Opções de `col`; com `selected`, só as que ocorrem com os valores pai selecionados"""
+    if not selected:
+        return catalog['options'][col]
+    children = catalog[mapping]
+    if len(selected) == 1:
+        return children.get(selected[0], [])
+    return sorted(set().union(*(children.get(value, ()) for value in selected)))
+
+# --- Chave do estado de filtros ---
+def filter_state_key(filters):
+    """Chave canônica do estado de filtros: apenas dimensões ativas, valores sem repetição e ordenados"""
+    return tuple(
+        (col, tuple(sorted(set(selected))))
+        for col, selected in sorted(filters.items())
+        if selected
+    )
+
+# --- Fatias por estado de filtros ---
+# As contagens são sempre calculadas sobre as linhas filtradas (bincount sobre os códigos, ver
+# count_frame); a fatia identifica o estado de filtros para o memo de agregados
+def make_slice(version, filters):
+    """Fatia de um estado de filtros; 'key' identifica o estado no memo de agregados"""
+    return {
+        'version': version,
+        'filters': filters,
+        'key': (version, filter_state_key(filters))
+    }
+
+def narrow_slice(filter_slice, col, values):
+    """Restringe a fatia a `values` em `col`; None se a interseção com o filtro atual for vazia"""
+    if filter_slice is None:
+        return None
+    filters = dict(filter_slice['filters'])
+    current = filters.get(col)
+    values = list(values)
+    if current:
+        allowed = set(values)
+        values = [value for value in current if value in allowed]
+    if not values:
+        return None
+    filters[col] = values
+    return make_slice(filter_slice['version'], filters)
+
+def group_counts(df, by, filter_slice=None):
+    """Contagens por `by` no formato groupby().size(), memoizadas por fatia"""
+    by = [by] if isinstance(by, str) else list(by)
+    return memo_aggregate(filter_slice, 'group_counts', lambda: count_frame(df, by), by=tuple(by))
+
+def column_counts(df, col, filter_slice=None, k=None):
+    """top_rows(group_counts(df, col), k) como Series indexada pelo valor: os k mais frequentes"""
+    counts = top_rows(group_counts(df, col, filter_slice), k)
+    return counts.set_index(col)['count']
+
+def crosstab_counts(df, row, col, normalize=False, filter_slice=None):
+    """Equivalente a pd.crosstab(df[row], df[col], normalize=...), a partir das contagens"""
+    counts = group_counts(df, [row, col], filter_slice)
+    table = counts.pivot(index=row, columns=col, values='count').fillna(0).astype('int64')
+    table = table.sort_index(axis=0).sort_index(axis=1)
+    if normalize == 'index':
+        return table.div(table.sum(axis=1), axis=0)
+    if normalize == 'columns':
+        return table.div(table.sum(axis=0), axis=1)
+    return table
+
+# --- Seleção top-k ---
+def top_k_indices(values, k=None):
+    """Posições dos k maiores valores em ordem decrescente; empates pela posição (ordenação estável)
+    
+    Usa seleção parcial (np.partition): o custo da ordenação final depende de k, não do
+    número de chaves. Com k=None ordena tudo.
+    """
+    values = np.asarray(values)
+    n = len(values)
+    if k is None or k >= n:
+        return np.argsort(-values, kind='stable')
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    
+    # k-ésimo maior valor: entram todos acima dele e os primeiros empatados com ele
+    kth = np.partition(values, n - k)[n - k]
+    above = np.flatnonzero(values > kth)
+    tied = np.flatnonzero(values == kth)[:k - len(above)]
+    candidates = np.concatenate([above, tied])
+    return candidates[np.lexsort((candidates, -values[candidates]))]
+
+def top_k_per_group(groups, values, k):
+    """Posições dos k maiores valores de cada grupo, em ordem decrescente global (estável)
+    
+    Equivale a ordenar por valor e aplicar groupby(groups).head(k).
+    """
+    groups = np.asarray(groups)
+    values = np.asarray(values)
+    positions = np.arange(len(values))
+    # Ordena por grupo, valor decrescente e posição; a posição no bloco do grupo é o rank
+    order = np.lexsort((positions, -values, groups))
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    ranks = positions - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    kept = order[ranks < k]
+    return kept[np.lexsort((kept, -values[kept]))]
+
+def top_rows(frame, k=None, col='count'):
+    """Linhas de `frame` com os k maiores valores de `col`, como sort_values(stable).head(k)"""
+    return frame.iloc[top_k_indices(frame[col].to_numpy(), k)]
+
+# --- Contagem por códigos (np.bincount) ---
+# Acima deste número de células o array denso não compensa e a contagem usa o groupby
+DENSE_COUNT_LIMIT = 5_000_000
+
+def count_codes(df, by):
+    """Conta as combinações das colunas `by` com np.bincount sobre os códigos combinados
+    
+    Retorna o array denso de contagens (um eixo por coluna, na ordem dos valores) e os
+    descritores das dimensões para consulta dos rótulos. O array é None quando o produto
+    das cardinalidades excede DENSE_COUNT_LIMIT.
+    """
+    dims = []
+    codes_list = []
+    for col in by:
+        codes, values = dimension_codes(df[col])
+        codes_list.append(codes)
+        dims.append({'name': col, 'values': values, 'dtype': df[col].dtype})
+    
+    shape = tuple(len(dim['values']) for dim in dims)
+    if np.prod(shape, dtype=float) > DENSE_COUNT_LIMIT:
+        return None, dims
+    
+    # Código combinado em base mista; linhas com algum valor ausente (-1) não contam
+    combined = np.zeros(len(df), dtype=np.int64)
+    valid = np.ones(len(df), dtype=bool)
+    for codes, size in zip(codes_list, shape):
+        combined = combined * size + codes
+        valid &= codes >= 0
+    
+    dense = np.bincount(combined[valid], minlength=int(np.prod(shape))).reshape(shape)
+    return dense, dims
+
+def decode_dimension(dim, codes):
+    """Converte códigos de volta para os rótulos com o tipo original da coluna"""
+    if isinstance(dim['dtype'], pd.CategoricalDtype):
+        return pd.Categorical.from_codes(codes, dtype=dim['dtype'])
+    return dim['values'].take(codes).astype(dim['dtype'])
+
+def dense_counts_frame(dense, dims, name='count'):
+    """Converte as células não vazias no formato de groupby().size().reset_index()"""
+    # np.nonzero percorre em ordem C, ou seja, chaves já ordenadas como no groupby
+    cells = np.nonzero(dense)
+    frame = pd.DataFrame({dim['name']: decode_dimension(dim, codes) for dim, codes in zip(dims, cells)})
+    frame[name] = dense[cells].astype(np.int64)
+    return frame
+
+def count_frame(df, by, name='count'):
+    """Equivalente a df.groupby(by).size().reset_index(name=name) sobre códigos inteiros"""
+    by = [by] if isinstance(by, str) else list(by)
+    dense, dims = count_codes(df, by)
+    if dense is None:
+        return df.groupby(by, observed=True).size().reset_index(name=name)
+    return dense_counts_frame(dense, dims, name)
+
+# --- Funções auxiliares ---
+def calculate_crime_rate(df, group_col):
+    """Calcula taxa de crimes por grupo (ex: por município)"""
+    counts = count_frame(df, group_col, name='total_crimes')
+    
+    # Aqui normalmente usaríamos dados populacionais, mas como não temos,
+    # vamos usar o total de crimes como base para comparação relativa
+    total = counts['total_crimes'].sum()
+    counts['crime_rate'] = (counts['total_crimes'] / total) * 1000  # Taxa por 1000 ocorrências
+    
+    return counts
+
+@profiled('análise')
+def get_crime_trends(df, time_col='MES_ANO_FORMATADO', crime_col='NATUREZA_APURADA'):
+    """Analisa tendências de crimes ao longo do tempo"""
+    # Agrupa por período e tipo de crime
+    trends = count_frame(df, [time_col, crime_col])
+    
+    # Pivota para ter crimes como colunas
+    pivot = trends.pivot(index=time_col, columns=crime_col, values='count').fillna(0)
+    
+    # Calcula variação percentual
+    pct_change = pivot.pct_change() * 100
+    
+    return pivot, pct_change
+
+@profiled('análise')
+def get_top_crime_correlations(df, filter_slice=None):
+    """Identifica correlações entre diferentes variáveis"""
+    return memo_aggregate(filter_slice, 'correlations', lambda: _top_crime_correlations(df))
+
+def _top_crime_correlations(df):
+    # Correlação entre indicadores (one-hot) das variáveis categóricas, a partir das
+    # contagens de coocorrência; exata para variáveis indicadoras
+    cat_vars = ['CATEGORIA_CRIME', 'TIPO_LOCAL', 'PERIODO_DIA', 'FIM_DE_SEMANA', 'TURNO']
+    labels, cooccurrence = cooccurrence_matrix(df, cat_vars)
+    corr_matrix = indicator_correlation(cooccurrence, len(df))
+    
+    # Extrai correlações mais fortes do triângulo superior (excluindo autocorrelações)
+    rows, cols = np.triu_indices(len(labels), k=1)
+    values = corr_matrix[rows, cols]
+    strong = np.flatnonzero(np.abs(values) > 0.1)  # Limiar de correlação (NaN fica de fora)
+    
+    # Ordena por força da correlação (absoluta); empates mantêm a ordem da matriz
+    top = strong[np.argsort(-np.abs(values[strong]), kind='stable')][:10]
+    
+    return [
+        {'var1': labels[rows[k]], 'var2': labels[cols[k]], 'correlation': float(values[k])}
+        for k in top
+    ]  # Retorna top 10 correlações
+
+def cooccurrence_matrix(df, cols):
+    """Rótulos 'COLUNA_valor' e matriz de coocorrência dos indicadores de cada valor das colunas
+    
+    A diagonal traz a frequência de cada valor; valores da mesma coluna nunca coocorrem.
+    Ocupa O(categorias²) em memória, sem materializar as colunas indicadoras.
+    """
+    labels = []
+    sizes = []
+    for col in cols:
+        _, dims = count_codes(df, [col])
+        labels.extend(f'{col}_{value}' for value in dims[0]['values'])
+        sizes.append(len(dims[0]['values']))
+    
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    matrix = np.zeros((offsets[-1], offsets[-1]), dtype=np.int64)
+    for i, col_i in enumerate(cols):
+        for j in range(i, len(cols)):
+            dense, _ = count_codes(df, [col_i, cols[j]] if i != j else [col_i])
+            if i == j:
+                dense = np.diag(dense)
+            matrix[offsets[i]:offsets[i + 1], offsets[j]:offsets[j + 1]] = dense
+            matrix[offsets[j]:offsets[j + 1], offsets[i]:offsets[i + 1]] = dense.T
+    return labels, matrix
+
+def indicator_correlation(cooccurrence, n):
+    """Correlação de Pearson entre indicadores a partir das coocorrências (NaN se constante)"""
+    counts = np.diag(cooccurrence).astype(float)
+    covariance = n * cooccurrence - np.outer(counts, counts)
+    variance = counts * (n - counts)
+    denominator = np.sqrt(np.outer(variance, variance))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, covariance / denominator, np.nan)
+
+@profiled('análise')
+def get_crime_hotspots(df, location_col='BAIRRO', crime_col='NATUREZA_APURADA'):
+    """Identifica hotspots de crimes por localização"""
+    # Agrupa por localização e tipo de crime
+    hotspots = count_frame(df, [location_col, crime_col])
+    
+    # Identifica os locais com maior incidência para cada tipo de crime
+    groups, _ = dimension_codes(hotspots[crime_col])
+    top_locations = hotspots.iloc[top_k_per_group(groups, hotspots['count'].to_numpy(), 3)]
+    
+    return top_locations
+
+@profiled('análise')
+def get_reporting_efficiency(df, filter_slice=None):
+    """Analisa eficiência no registro de ocorrências"""
+    return memo_aggregate(filter_slice, 'reporting_efficiency', lambda: _reporting_efficiency(df))
+
+def _reporting_efficiency(df):
+    # Filtra para remover outliers e valores negativos
+    valid_days = df[(df['DIAS_ATE_REGISTRO'] >= 0) & (df['DIAS_ATE_REGISTRO'] <= 365)]
+    
+    # Agrupa por delegacia
+    efficiency = valid_days.groupby('DELEGACIA_SIMPLES', observed=True)['DIAS_ATE_REGISTRO'].agg(
+        ['mean', 'median', 'count']
+    ).reset_index()
+    
+    # Renomeia colunas
+    efficiency.columns = ['Delegacia', 'Média de Dias', 'Mediana de Dias', 'Total de Registros']
+    
+    # Ordena por mediana (mais robusta que média)
+    efficiency = efficiency.sort_values('Mediana de Dias')
+    
+    return efficiency
+
+@profiled('análise')
+def get_temporal_patterns(df, filter_slice=None):
+    """Analisa padrões temporais nos crimes"""
+    # Por hora do dia
+    hour_pattern = group_counts(df, 'HORA_DIA', filter_slice)
+    
+    # Por dia da semana
+    weekday_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    weekday_pattern = group_counts(df, 'DIA_SEMANA', filter_slice)
+    weekday_pattern['DIA_SEMANA_ORDER'] = pd.Categorical(
+        weekday_pattern['DIA_SEMANA'], categories=weekday_order, ordered=True
+    )
+    weekday_pattern = weekday_pattern.sort_values('DIA_SEMANA_ORDER')
+    
+    # Por mês
+    month_pattern = group_counts(df, 'MES_OCORRENCIA', filter_slice)
+    month_pattern = month_pattern.sort_values('MES_OCORRENCIA')
+    
+    return hour_pattern, weekday_pattern, month_pattern
+
+def count_by_month(df, *group_cols, filter_slice=None):
+    """Conta ocorrências por mês (AAAA-MM) e colunas adicionais, sem reformatar datas"""
+    counts = group_counts(df, ['ANO_MES_OCORRENCIA', *group_cols], filter_slice)
+    return counts.rename(columns={'ANO_MES_OCORRENCIA': 'MES_ANO'})
+
+@profiled('análise')
+def get_crime_type_distribution(df, group_col='CATEGORIA_CRIME', filter_slice=None):
+    """Analisa distribuição de tipos de crimes"""
+    distribution = group_counts(df, group_col, filter_slice)
+    distribution['percentage'] = (distribution['count'] / distribution['count'].sum()) * 100
+    distribution = distribution.sort_values('count', ascending=False)
+    
+    return distribution
+
+@profiled('análise')
+def get_comparative_analysis(df, group_col='NOME_MUNICIPIO_CIRCUNSCRIÇÃO'):
+    """Realiza análise comparativa entre grupos (ex: municípios)"""
+    # Total de crimes por grupo
+    total_by_group = count_frame(df, group_col, name='total_crimes')
+    
+    # Tipos de crimes mais comuns por grupo
+    top_crimes_by_group = count_frame(df, [group_col, 'NATUREZA_APURADA'])
+    top_crimes_by_group = top_crimes_by_group.sort_values(['count'], ascending=False)
+    
+    # Períodos mais comuns por grupo
+    period_by_group = count_frame(df, [group_col, 'PERIODO_DIA'])
+    
+    return total_by_group, top_crimes_by_group, period_by_group
+
+@profiled('análise')
+def generate_insights(df, filter_slice=None):
+    """Gera insights automáticos baseados nos dados"""
+    return memo_aggregate(filter_slice, 'insights', lambda: _generate_insights(df, filter_slice))
+
+def _generate_insights(df, filter_slice):
+    insights = []
+    
+    # Insight 1: Horários de maior ocorrência
+    hour_pattern, _, _ = get_temporal_patterns(df, filter_slice)
+    if not hour_pattern.empty:
+        peak_hour = hour_pattern.loc[hour_pattern['count'].idxmax(), 'HORA_DIA']
+        insights.append({
+            'title': 'Horário de Maior Risco',
+            'description': f'O horário com maior número de ocorrências é às {int(peak_hour)}h, '
+                          f'representando um ponto crítico para atenção das autoridades.'
+        })
+    
+    # Insight 2: Relação entre tipo de crime e local
+    crime_location = top_rows(group_counts(df, ['CATEGORIA_CRIME', 'TIPO_LOCAL'], filter_slice), 1)
+    if not crime_location.empty:
+        top_pair = crime_location.iloc[0]
+        insights.append({
+            'title': 'Padrão Crime-Local',
+            'description': f'Há uma forte associação entre {top_pair["CATEGORIA_CRIME"]} e '
+                          f'{top_pair["TIPO_LOCAL"]}, sugerindo um padrão específico de ocorrências.'
+        })
+    
+    # Insight 3: Eficiência no registro
+    efficiency = get_reporting_efficiency(df, filter_slice)
+    if not efficiency.empty:
+        best_delegacia = efficiency.iloc[0]['Delegacia']
+        worst_delegacia = efficiency.iloc[-1]['Delegacia']
+        insights.append({
+            'title': 'Eficiência no Registro',
+            'description': f'A delegacia {best_delegacia} apresenta o menor tempo médio para registro de ocorrências, '
+                          f'enquanto {worst_delegacia} tem o maior tempo, indicando possíveis diferenças operacionais.'
+        })
+    
+    # Insight 4: Tendência temporal
+    recent_df = df[df['ANO_OCORRENCIA'] >= df['ANO_OCORRENCIA'].max() - 1]
+    monthly_counts = count_frame(recent_df, 'MES_ANO_FORMATADO')
+    if len(monthly_counts) >= 2:
+        last_month = monthly_counts.iloc[-1]['count']
+        prev_month = monthly_counts.iloc[-2]['count']
+        pct_change = ((last_month - prev_month) / prev_month) * 100
+        direction = "aumento" if pct_change > 0 else "redução"
+        insights.append({
+            'title': 'Tendência Recente',
+            'description': f'Houve um {direction} de {abs(pct_change):.1f}% nas ocorrências entre os dois últimos '
+                          f'períodos analisados, indicando uma mudança significativa no padrão criminal.'
+        })
+    
+    # Insight 5: Concentração geográfica
+    location_counts = top_rows(group_counts(df, 'BAIRRO', filter_slice), 3)
+    if not location_counts.empty:
+        top_locations = location_counts['BAIRRO'].tolist()
+        insights.append({
+            'title': 'Concentração Geográfica',
+            'description': f'Os bairros {", ".join(top_locations)} concentram o maior número de ocorrências, '
+                          f'sugerindo áreas prioritárias para ações preventivas.'
+        })
+    
+    return insights
+
+# --- Histogramas ---
+def integer_bin_edges(values, nbins):
+    """Bordas de classes com largura inteira centradas nos valores (dados discretos, ex.: dias)"""
+    low, high = int(values.min()), int(values.max())
+    width = max(1, -(-(high - low + 1) // nbins))
+    return low - 0.5 + width * np.arange((high - low) // width + 2)
+
+def histogram_bins(values, nbins):
+    """Histograma calculado no servidor: (bordas, contagens) das classes
+    
+    Para o navegador vão só as classes, não uma linha por ocorrência.
+    """
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.integer):
+        edges = integer_bin_edges(values, nbins)
+    else:
+        edges = np.histogram_bin_edges(values, bins=nbins)
+    counts, edges = np.histogram(values, bins=edges)
+    return edges, counts
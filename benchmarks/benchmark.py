@@ -0,0 +1,214 @@
+"""Benchmark das etapas do dashboard com dados sintéticos
+
+Mede, em cada volume, a leitura do CSV, prepare_data, o snapshot Parquet, os índices
+(filtros e catálogo), a cadeia de filtros da barra lateral e as funções get_*,
+reportando tempo, vazão (linhas/s) e pico de memória (RSS) de cada etapa.
+
+Cada volume roda em um processo separado, para que o pico de memória de um não
+contamine o do outro. Os CSVs sintéticos ficam em .cache/benchmarks e são reaproveitados.
+
+Uso:
+    python benchmarks/benchmark.py                               # 100k, 1M e 10M linhas
+    python benchmarks/benchmark.py --linhas 100000 1000000 --saida atual.json
+    python benchmarks/benchmark.py --base atual.json             # destaca regressões
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from gerar_dados import gravar_csv
+
+VOLUMES = [100_000, 1_000_000, 10_000_000]
+DADOS_DIR = os.path.join('.cache', 'benchmarks')
+TOLERANCIA = 0.2  # variação de tempo acima da qual uma etapa é marcada como regressão
+INTERVALO_AMOSTRA = 0.005  # segundos entre leituras de RSS
+FACETAS = ['BAIRRO', 'DELEGACIA_SIMPLES', 'NATUREZA_APURADA']  # filtros com contagens na barra lateral
+
+# --- Medição ---
+@contextmanager
+def amostrar_rss():
+    """Acompanha o RSS do processo em segundo plano; o dicionário recebe 'inicio', 'pico' e 'fim' (bytes)"""
+    from analise_crimes_sp import process_rss
+
+    rss = {'inicio': process_rss() or 0}
+    rss['pico'] = rss['inicio']
+    parar = threading.Event()
+
+    def amostrar():
+        while not parar.wait(INTERVALO_AMOSTRA):
+            rss['pico'] = max(rss['pico'], process_rss() or 0)
+
+    amostrador = threading.Thread(target=amostrar, daemon=True)
+    amostrador.start()
+    try:
+        yield rss
+    finally:
+        parar.set()
+        amostrador.join()
+        rss['fim'] = process_rss() or 0
+        rss['pico'] = max(rss['pico'], rss['fim'])
+
+def medir(resultados, etapa, linhas, func, *args, **kwargs):
+    """Executa func registrando tempo, vazão e pico de RSS acima do início da etapa"""
+    with amostrar_rss() as rss:
+        inicio = time.perf_counter()
+        resultado = func(*args, **kwargs)
+        segundos = time.perf_counter() - inicio
+
+    resultados.append({
+        'etapa': etapa,
+        'linhas': linhas,
+        'segundos': round(segundos, 4),
+        'linhas_por_s': round(linhas / segundos) if segundos > 0 else None,
+        'pico_mb': round((rss['pico'] - rss['inicio']) / 2**20, 1)
+    })
+    return resultado
+
+def filtros_vazios():
+    from analise_crimes_sp import FILTER_COLUMNS
+    return {col: [] for col in FILTER_COLUMNS}
+
+def executar_volume(path):
+    """Roda todas as etapas sobre o CSV em `path` (no processo atual)"""
+    import pandas as pd
+    import analise_crimes_sp as analise
+
+    resultados = []
+    n = sum(1 for _ in open(path, encoding='utf-8')) - 1
+
+    bruto = medir(resultados, 'leitura_csv', n, pd.read_csv, path)
+    df = medir(resultados, 'prepare_data', n, analise.prepare_data, bruto)
+    del bruto
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = os.path.join(tmp, 'dados.parquet')
+        medir(resultados, 'snapshot_gravacao', n, analise.write_snapshot, df, snapshot)
+        df = medir(resultados, 'snapshot_leitura', n, analise.read_snapshot, snapshot)
+
+    index = medir(resultados, 'indice_filtros', n, analise.build_filter_index, df)
+    catalog = medir(resultados, 'catalogo_filtros', n, analise.build_filter_catalog, df, index)
+
+    # Cadeia de filtros da barra lateral: padrão (dois últimos anos) e uma seleção estreita
+    filtros = filtros_vazios()
+    anos = analise.catalog_options(catalog, 'ANO_REGISTRO')
+    filtros['ANO_REGISTRO'] = anos[-2:]
+
+    def contagens_faceta():
+        # Como na barra lateral: cada faceta sob os filtros das demais dimensões
+        return [
+            analise.dimension_counts(index['dims'][col], analise.resolve_filters(index, dict(filtros, **{col: []})))
+            for col in FACETAS
+        ]
+
+    medir(resultados, 'contagens_faceta', n, contagens_faceta)
+    filtrado = medir(resultados, 'filtros_padrao', n, analise.apply_filters, df, index, filtros)
+
+    seletivos = dict(filtros, **{
+        'NOME_MUNICIPIO_CIRCUNSCRIÇÃO': ['S.PAULO'],
+        'CATEGORIA_CRIME': ['Crimes contra o patrimônio (Roubo)'],
+        'PERIODO_DIA': ['Noite (18h-22h)']
+    })
+    medir(resultados, 'filtros_seletivos', n, analise.apply_filters, df, index, seletivos)
+
+    medir(resultados, 'contagem_cruzada', len(filtrado), analise.count_frame, filtrado, ['CATEGORIA_CRIME', 'PERIODO_DIA'])
+
+    # Funções de análise sobre o recorte padrão, sem memo (filter_slice=None)
+    analises = [
+        ('get_crime_trends', analise.get_crime_trends),
+        ('get_top_crime_correlations', analise.get_top_crime_correlations),
+        ('get_crime_hotspots', analise.get_crime_hotspots),
+        ('get_reporting_efficiency', analise.get_reporting_efficiency),
+        ('get_temporal_patterns', analise.get_temporal_patterns),
+        ('get_crime_type_distribution', analise.get_crime_type_distribution),
+        ('get_comparative_analysis', analise.get_comparative_analysis),
+        ('generate_insights', analise.generate_insights),
+    ]
+    for nome, func in analises:
+        medir(resultados, nome, len(filtrado), func, filtrado)
+
+    return {
+        'linhas': n,
+        'linhas_filtradas': len(filtrado),
+        'etapas': resultados,
+        'pico_processo_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+# --- Execução e relatório ---
+def csv_sintetico(n, dados_dir, semente):
+    path = os.path.join(dados_dir, f'sinteticos_{n}_{semente}.csv')
+    if not os.path.exists(path):
+        os.makedirs(dados_dir, exist_ok=True)
+        print(f'Gerando {n:,} linhas em {path}...', file=sys.stderr)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        gravar_csv(n, tmp_path, semente)
+        os.replace(tmp_path, path)
+    return path
+
+def rodar_em_subprocesso(path):
+    saida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--volume-csv', path],
+        check=True, stdout=subprocess.PIPE, text=True
+    ).stdout
+    return json.loads(saida)
+
+def formatar(resultado, base=None):
+    """Tabela de um volume; com `base`, acrescenta a razão de tempo e marca regressões"""
+    base_etapas = {etapa['etapa']: etapa for etapa in (base or {}).get('etapas', [])}
+    linhas = [
+        f"== {resultado['linhas']:,} linhas ({resultado['linhas_filtradas']:,} após filtros padrão), "
+        f"pico do processo {resultado['pico_processo_mb']:,.0f} MB ==",
+        f"{'etapa':<30}{'segundos':>10}{'linhas/s':>14}{'pico MB':>10}" + (f"{'vs base':>12}" if base else '')
+    ]
+    for etapa in resultado['etapas']:
+        vazao = f"{etapa['linhas_por_s']:,}" if etapa['linhas_por_s'] else '-'
+        linha = f"{etapa['etapa']:<30}{etapa['segundos']:>10.3f}{vazao:>14}{etapa['pico_mb']:>10.1f}"
+        anterior = base_etapas.get(etapa['etapa'])
+        if anterior and anterior['segundos'] > 0:
+            razao = etapa['segundos'] / anterior['segundos']
+            marca = ' REGRESSÃO' if razao > 1 + TOLERANCIA and etapa['segundos'] >= 0.01 else ''
+            linha += f"{razao:>11.2f}x{marca}"
+        linhas.append(linha)
+    return '\n'.join(linhas)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, nargs='+', default=VOLUMES)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--dados-dir', default=DADOS_DIR)
+    parser.add_argument('--saida', help='grava os resultados em JSON')
+    parser.add_argument('--base', help='JSON de uma execução anterior para comparação')
+    parser.add_argument('--volume-csv', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.volume_csv:
+        print(json.dumps(executar_volume(args.volume_csv)))
+        return
+
+    base = {}
+    if args.base:
+        with open(args.base, encoding='utf-8') as f:
+            base = json.load(f)['volumes']
+
+    volumes = {}
+    for n in args.linhas:
+        resultado = rodar_em_subprocesso(csv_sintetico(n, args.dados_dir, args.semente))
+        volumes[str(n)] = resultado
+        print(formatar(resultado, base.get(str(n))), end='\n\n', flush=True)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump({'semente': args.semente, 'volumes': volumes}, f, indent=2, ensure_ascii=False)
+
+if __name__ == '__main__':
+    main()
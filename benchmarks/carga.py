@@ -0,0 +1,274 @@
+"""Teste de carga do dashboard com sessões simultâneas (AppTest, sem navegador)
+
+Cada sessão simulada abre o dashboard e executa um roteiro de interações (troca de
+página, seleção de filtros, troca de aba, limpeza dos filtros) sorteado a partir da
+semente. As sessões rodam em threads no mesmo processo, como em um worker do Streamlit,
+e compartilham os caches (st.cache_data/st.cache_resource). O relatório traz os
+percentis de latência por tipo de interação e o RSS do processo.
+
+Para que as sessões compartilhem o runtime e o cache de scripts, o teste substitui internos
+privados do Streamlit (Runtime.instance/exists e o ScriptCache do AppTest), que mudam entre
+versões. Ele roda apenas na versão fixada em STREAMLIT_SUPORTADO (a de requirements.txt) e
+encerra com erro em qualquer outra.
+
+Uso:
+    python benchmarks/carga.py --sessoes 8 --interacoes 20
+    python benchmarks/carga.py --sessoes 8 --linhas 1000000 --saida carga.json   # dados sintéticos
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark import DADOS_DIR, amostrar_rss, csv_sintetico
+
+APP_PATH = os.path.join(RAIZ, 'dashboard_crimes_sp.py')
+DATA_FILE = 'dados_criminais_limpos.csv'
+
+PAGINAS = ["📊 Visão Geral", "🔎 Análise Aprofundada", "📈 Tendências", "🗺️ Análise Geográfica", "⚖️ Análise Comparativa"]
+CHAVE_MENU = 'carga_menu'
+CHAVE_ABAS = 'aba_analise_aprofundada'
+
+# Filtros de texto sorteados nas interações (os de ano/mês mantêm o padrão da sessão)
+COLUNAS_FILTRO = [
+    'PERIODO_DIA', 'DIA_SEMANA', 'NOME_MUNICIPIO_CIRCUNSCRIÇÃO', 'BAIRRO',
+    'DELEGACIA_SIMPLES', 'TIPO_LOCAL', 'CATEGORIA_CRIME', 'NATUREZA_APURADA'
+]
+# Peso de cada tipo de interação no roteiro
+INTERACOES = {'menu': 0.35, 'filtro': 0.45, 'aba': 0.1, 'limpar': 0.1}
+PERCENTIS = [50, 90, 95, 99]
+# Série do Streamlit cujos internos runtime_compartilhado() substitui
+STREAMLIT_SUPORTADO = '1.44.'
+
+# Rótulo das opções com contagem por faceta: "valor (1,234)"
+ROTULO_FACETA = re.compile(r'^(.*) \([\d,]+\)$')
+
+# --- Sessão simulada ---
+def option_menu_da_sessao(menu_title, options, **kwargs):
+    """Substitui o componente option_menu (sem suporte no AppTest) pela página da sessão"""
+    import streamlit as st
+    return st.session_state.get(CHAVE_MENU, options[kwargs.get('default_index', 0)])
+
+def verificar_streamlit():
+    """Encerra se a versão instalada do Streamlit não for a suportada por runtime_compartilhado()"""
+    import streamlit
+
+    if not streamlit.__version__.startswith(STREAMLIT_SUPORTADO):
+        raise SystemExit(
+            f'carga.py requer Streamlit {STREAMLIT_SUPORTADO}x (encontrado {streamlit.__version__}): '
+            'o compartilhamento do runtime entre sessões depende de internos privados dessa versão'
+        )
+
+def runtime_compartilhado():
+    """Runtime simulado e cache de bytecode únicos para todas as sessões
+
+    O AppTest cria um runtime simulado a cada rerun e o descarta ao final, o que derruba
+    os reruns das outras sessões em andamento; também recompila o script a cada rerun.
+    Aqui todas usam os mesmos, como as sessões de um worker real compartilham o runtime
+    e o cache de scripts do servidor.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+    script_cache = ScriptCache()
+    app_test.ScriptCache = lambda: script_cache
+
+def valor_da_opcao(rotulo):
+    match = ROTULO_FACETA.match(rotulo)
+    return match.group(1) if match else rotulo
+
+def roteiro(rng, n):
+    """Sequência de (tipo, argumento) de uma sessão"""
+    tipos = rng.choices(list(INTERACOES), weights=list(INTERACOES.values()), k=n)
+    return [(tipo, rng.choice(PAGINAS) if tipo == 'menu' else rng.choice(COLUNAS_FILTRO) if tipo == 'filtro' else None)
+            for tipo in tipos]
+
+def interagir(at, rng, tipo, argumento, timeout):
+    """Aplica a interação ao AppTest e roda o script; retorna o tipo efetivo ou None se não se aplica"""
+    from dashboard_crimes_sp import FILTER_WIDGET_KEYS
+
+    if tipo == 'menu':
+        at.session_state[CHAVE_MENU] = argumento
+    elif tipo == 'filtro':
+        widget = next((elemento for elemento in at.multiselect if elemento.key == FILTER_WIDGET_KEYS[argumento]), None)
+        if widget is None or not widget.options:
+            return None
+        rotulos = rng.sample(widget.options, min(len(widget.options), rng.randint(1, 2)))
+        widget.set_value([valor_da_opcao(rotulo) for rotulo in rotulos])
+    elif tipo == 'aba':
+        abas = [elemento for elemento in at.button_group if elemento.key == CHAVE_ABAS]
+        if not abas:
+            return None
+        opcao = rng.choice(abas[0].options)
+        # O segmented_control separa o emoji inicial do rótulo
+        abas[0].set_value([f'{opcao.content_icon} {opcao.content}' if opcao.content_icon else opcao.content])
+    elif tipo == 'limpar':
+        botoes = [botao for botao in at.button if botao.label == "Limpar Todos os Filtros"]
+        if not botoes:
+            return None
+        botoes[0].click()
+    # O AppTest lê o valor de seleção única do segmented_control como texto e o percorre
+    # caractere a caractere ao montar o estado dos widgets; reenvia-o como lista
+    for grupo in at.button_group:
+        if isinstance(grupo.value, str):
+            grupo.set_value([grupo.value])
+    at.run(timeout=timeout)
+    return tipo
+
+def executar_sessao(sessao, semente, n_interacoes, timeout, inicio, registros):
+    """Abre uma sessão e executa seu roteiro, acrescentando uma medição por rerun em `registros`"""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(semente * 1000 + sessao)
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    passos = [('abertura', None)] + roteiro(rng, n_interacoes)
+    inicio.wait()
+
+    for passo, (tipo, argumento) in enumerate(passos):
+        t0 = time.perf_counter()
+        erro = None
+        try:
+            if tipo == 'abertura':
+                at.run()
+            else:
+                tipo = interagir(at, rng, tipo, argumento, timeout)
+            if tipo is not None and at.exception:
+                erro = at.exception[0].message
+        except Exception as exc:  # noqa: BLE001 - a falha entra no relatório
+            erro = f'{type(exc).__name__}: {exc}'
+        if tipo is None:
+            continue
+        registros.append({
+            'sessao': sessao,
+            'passo': passo,
+            'tipo': tipo,
+            'argumento': argumento,
+            'pagina': at.session_state[CHAVE_MENU] if CHAVE_MENU in at.session_state else PAGINAS[0],
+            'segundos': time.perf_counter() - t0,
+            'erro': erro
+        })
+
+def aquecer(timeout):
+    """Rerun inicial fora da medição concorrente: carga dos dados e construção dos índices"""
+    from streamlit.testing.v1 import AppTest
+
+    t0 = time.perf_counter()
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.run()
+    return time.perf_counter() - t0
+
+# --- Relatório ---
+def percentis(segundos):
+    valores = np.asarray(segundos) * 1000
+    return {f'p{p}': round(float(np.percentile(valores, p)), 1) for p in PERCENTIS} | {'max': round(float(valores.max()), 1)}
+
+def resumir(registros, duracao, rss, sessoes, aquecimento):
+    por_tipo = {}
+    for registro in registros:
+        por_tipo.setdefault(registro['tipo'], []).append(registro['segundos'])
+    erros = [registro for registro in registros if registro['erro']]
+    return {
+        'sessoes': sessoes,
+        'interacoes': len(registros),
+        'erros': len(erros),
+        'exemplos_erro': sorted({registro['erro'] for registro in erros})[:5],
+        'duracao_s': round(duracao, 2),
+        'interacoes_por_s': round(len(registros) / duracao, 2) if duracao > 0 else None,
+        'aquecimento_s': None if aquecimento is None else round(aquecimento, 2),
+        'latencia_ms': {
+            'todas': percentis([registro['segundos'] for registro in registros]),
+            **{tipo: percentis(valores) | {'n': len(valores)} for tipo, valores in sorted(por_tipo.items())}
+        },
+        'rss_mb': {chave: round(valor / 2**20, 1) for chave, valor in rss.items()}
+    }
+
+def formatar(resumo):
+    linhas = [
+        f"== {resumo['sessoes']} sessões, {resumo['interacoes']} interações em {resumo['duracao_s']:.1f}s "
+        f"({resumo['interacoes_por_s']} interações/s), {resumo['erros']} erros ==",
+    ]
+    if resumo['aquecimento_s'] is not None:
+        linhas.append(f"aquecimento (primeira carga): {resumo['aquecimento_s']:.2f}s")
+    linhas.append(f"{'tipo':<12}{'n':>6}" + ''.join(f"{f'p{p} ms':>10}" for p in PERCENTIS) + f"{'max ms':>10}")
+    for tipo, valores in resumo['latencia_ms'].items():
+        n = valores.get('n', resumo['interacoes'])
+        linhas.append(f"{tipo:<12}{n:>6}" + ''.join(f"{valores[f'p{p}']:>10.1f}" for p in PERCENTIS) + f"{valores['max']:>10.1f}")
+    rss = resumo['rss_mb']
+    linhas.append(f"RSS: início {rss['inicio']:,.0f} MB, pico {rss['pico']:,.0f} MB, fim {rss['fim']:,.0f} MB")
+    linhas.extend(f"erro: {erro}" for erro in resumo['exemplos_erro'])
+    return '\n'.join(linhas)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessoes', type=int, default=4)
+    parser.add_argument('--interacoes', type=int, default=15, help='interações por sessão')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--linhas', type=int, help='usa um CSV sintético com esse número de linhas')
+    parser.add_argument('--dados-dir', default=DADOS_DIR)
+    parser.add_argument('--timeout', type=float, default=300, help='segundos por rerun')
+    parser.add_argument('--sem-aquecimento', action='store_true', help='mede também a primeira carga sob concorrência')
+    parser.add_argument('--saida', help='grava o resumo e as medições em JSON')
+    args = parser.parse_args()
+    verificar_streamlit()
+
+    # O dashboard lê o CSV do diretório de trabalho; com dados sintéticos, usa um diretório próprio
+    if args.linhas:
+        csv = os.path.abspath(csv_sintetico(args.linhas, args.dados_dir, args.semente))
+        trabalho = os.path.join(args.dados_dir, f'carga_{args.linhas}_{args.semente}')
+        os.makedirs(trabalho, exist_ok=True)
+        if not os.path.exists(os.path.join(trabalho, DATA_FILE)):
+            os.symlink(csv, os.path.join(trabalho, DATA_FILE))
+        os.chdir(trabalho)
+
+    logging.disable(logging.WARNING)
+    import streamlit_option_menu
+    streamlit_option_menu.option_menu = option_menu_da_sessao
+    runtime_compartilhado()
+
+    aquecimento = None if args.sem_aquecimento else aquecer(args.timeout)
+
+    registros = []
+    inicio = threading.Barrier(args.sessoes + 1)
+    threads = [
+        threading.Thread(target=executar_sessao, args=(sessao, args.semente, args.interacoes, args.timeout, inicio, registros))
+        for sessao in range(args.sessoes)
+    ]
+    for thread in threads:
+        thread.start()
+    with amostrar_rss() as rss:
+        inicio.wait()
+        t0 = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        duracao = time.perf_counter() - t0
+
+    resumo = resumir(registros, duracao, rss, args.sessoes, aquecimento)
+    print(formatar(resumo))
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump({'resumo': resumo, 'medicoes': registros}, f, indent=2, ensure_ascii=False)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""Gerador de dados sintéticos no esquema de dados_criminais_limpos.csv
+
+Reproduz os formatos do CSV real (DATA_REGISTRO dia-primeiro, DATA_OCORRENCIA_BO ISO,
+horas HH:MM:SS com ausentes, coordenadas zeradas) e a assimetria das dimensões:
+poucos municípios, naturezas e locais concentram a maior parte das ocorrências,
+enquanto bairros e logradouros têm cauda longa.
+
+Uso:
+    python benchmarks/gerar_dados.py 1000000 dados_sinteticos.csv [--semente 0]
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Ordem das colunas do CSV original
+COLUNAS = [
+    'NOME_MUNICIPIO_CIRCUNSCRIÇÃO', 'NOME_DELEGACIA_CIRCUNSCRIÇÃO', 'DATA_REGISTRO',
+    'DATA_OCORRENCIA_BO', 'HORA_OCORRENCIA_BO', 'DESCR_SUBTIPOLOCAL', 'BAIRRO',
+    'LOGRADOURO', 'NUMERO_LOGRADOURO', 'LATITUDE', 'LONGITUDE', 'NATUREZA_APURADA',
+    'RUBRICA', 'DESCR_CONDUTA', 'MES_ANO'
+]
+
+LOTE = 1_000_000  # linhas geradas e gravadas por vez
+
+# (natureza, peso, rubricas)
+NATUREZAS = [
+    ('FURTO (ART. 155)', 34.0, ['Furto (art. 155) - OUTROS', 'Furto (art. 155) - TRANSEUNTE', 'Furto (art. 155) - VEICULO']),
+    ('ROUBO (ART. 157)', 18.0, ['Roubo (art. 157) - TRANSEUNTE', 'Roubo (art. 157) - VEICULO', 'Roubo (art. 157) - ESTABELECIMENTO COMERCIAL']),
+    ('FURTO DE VEÍCULO', 8.0, ['Furto de veículo (art. 155)']),
+    ('ROUBO DE VEÍCULO', 4.0, ['Roubo de veículo (art. 157)']),
+    ('LESÃO CORPORAL DOLOSA', 9.0, ['Lesão corporal (art. 129)', 'Lesão corporal (art. 129 §9º) - violência doméstica']),
+    ('LESÃO CORPORAL CULPOSA POR ACIDENTE DE TRÂNSITO', 4.0, ['Lesão corporal culposa na direção de veículo (art. 303)']),
+    ('AMEAÇA', 7.0, ['Ameaça (art. 147)']),
+    ('ESTELIONATO', 6.0, ['Estelionato (art. 171)', 'Estelionato (art. 171 §2º) - fraude eletrônica']),
+    ('TRÁFICO DE ENTORPECENTES', 2.5, ['Tráfico de drogas (art. 33, caput)']),
+    ('PORTE DE ENTORPECENTES', 1.5, ['Porte de drogas para consumo pessoal (art. 28)']),
+    ('DROGAS SEM AUTORIZAÇÃO', 0.5, ['A.I.-Drogas sem autorização ou em desacordo (art. 33)']),
+    ('HOMICÍDIO DOLOSO', 0.3, ['Homicídio simples (art. 121)', 'Homicídio qualificado (art. 121 §2º)']),
+    ('HOMICÍDIO CULPOSO POR ACIDENTE DE TRÂNSITO', 0.3, ['Homicídio culposo na direção de veículo (art. 302)']),
+    ('TENTATIVA DE HOMICÍDIO', 0.3, ['Homicídio simples (art. 121) - tentativa']),
+    ('LATROCÍNIO', 0.05, ['Latrocínio (art. 157 §3º)']),
+    ('ESTUPRO', 0.3, ['Estupro (art. 213)']),
+    ('ESTUPRO DE VULNERÁVEL', 0.6, ['Estupro de vulnerável (art. 217-A)']),
+    ('DANO', 1.5, ['Dano (art. 163)']),
+    ('APROPRIAÇÃO INDÉBITA', 0.8, ['Apropriação indébita (art. 168)']),
+    ('RECEPTAÇÃO', 0.4, ['Receptação (art. 180)']),
+    ('INJÚRIA', 0.3, ['Injúria (art. 140)']),
+]
+
+# (local, peso)
+LOCAIS = [
+    ('Via Pública', 40.0), ('Residência', 16.0), ('Comércio e serviços', 7.0), ('Casa', 4.0),
+    ('Estacionamento particular', 2.0), ('Estacionamento público', 1.5), ('Loja', 1.5),
+    ('Shopping center', 1.2), ('Supermercado', 1.2), ('Condomínio residencial', 2.5),
+    ('Escola', 0.8), ('Instituição de ensino superior', 0.3), ('Ônibus', 1.2),
+    ('Estação de trem', 0.4), ('Trem', 0.3), ('Metrô', 0.5), ('Terminal rodoviário', 0.3),
+    ('Transporte coletivo', 0.4), ('Posto de gasolina', 0.8), ('Bar/Restaurante', 1.5),
+    ('Área não ocupada', 0.6), ('Hospital', 0.4), ('Igreja/Templo', 0.2), ('Rodovia/Estrada', 1.5),
+    ('Internet', 2.0), ('Outros', 3.0), (None, 1.0),
+]
+
+CONDUTAS = [
+    ('TRANSEUNTE', 12.0), ('VEICULO', 8.0), ('INTERIOR DE VEICULO', 5.0), ('RESIDENCIA', 6.0),
+    ('ESTABELECIMENTO COMERCIAL', 4.0), ('CELULAR', 6.0), ('OUTROS', 5.0), ('CARGA', 0.5),
+    ('CONDOMINIO RESIDENCIAL', 1.0), ('COLETIVO', 1.0), ('INTERIOR TRANSPORTE COLETIVO', 0.8),
+    ('CAIXA ELETRONICO', 0.3), ('ESTABELECIMENTO DE ENSINO', 0.3), (None, 50.0),
+]
+
+MUNICIPIOS_PRINCIPAIS = [
+    ('S.PAULO', -23.55, -46.63), ('GUARULHOS', -23.46, -46.53), ('CAMPINAS', -22.91, -47.06),
+    ('S.BERNARDO DO CAMPO', -23.69, -46.56), ('SANTO ANDRE', -23.66, -46.53), ('OSASCO', -23.53, -46.79),
+    ('S.JOSE DOS CAMPOS', -23.18, -45.88), ('RIBEIRAO PRETO', -21.18, -47.81), ('SOROCABA', -23.50, -47.46),
+    ('MOGI DAS CRUZES', -23.52, -46.19), ('SANTOS', -23.96, -46.33), ('DIADEMA', -23.69, -46.62),
+    ('JUNDIAI', -23.19, -46.88), ('CARAPICUIBA', -23.52, -46.84), ('PIRACICABA', -22.73, -47.65),
+    ('BAURU', -22.31, -49.06), ('ITAQUAQUECETUBA', -23.49, -46.35), ('S.VICENTE', -23.96, -46.39),
+    ('FRANCA', -20.54, -47.40), ('GUARUJA', -23.99, -46.26), ('SUZANO', -23.54, -46.31),
+]
+TOTAL_MUNICIPIOS = 645
+
+PREFIXOS_BAIRRO = ['JARDIM', 'VILA', 'PARQUE', 'CONJUNTO HABITACIONAL', 'RESIDENCIAL', 'JD.', 'VL.', 'CHACARA', 'CENTRO']
+PREFIXOS_LOGRADOURO = ['RUA', 'RUA', 'RUA', 'AVENIDA', 'TRAVESSA', 'ESTRADA', 'ALAMEDA', 'PRACA', 'RODOVIA']
+NOMES = [
+    'SANTA CRUZ', 'SAO JOSE', 'DAS FLORES', 'BOA VISTA', 'PAULISTA', 'SANTO ANTONIO', 'DOS IPES',
+    'NOVA ESPERANCA', 'AMERICA', 'BRASIL', 'INDEPENDENCIA', 'DOM PEDRO II', 'TIRADENTES',
+    'DAS PALMEIRAS', 'SANTA MARIA', 'SAO JOAO', 'BELA VISTA', 'DO CARMO', 'AURORA', 'SAO PEDRO'
+]
+
+INICIO = np.datetime64('2022-01-01')
+DIAS = 3 * 365
+
+# Proporções aproximadas de valores ausentes ou inválidos
+PROP_HORA_AUSENTE = 0.08
+PROP_HORA_INVALIDA = 0.002
+PROP_COORD_ZERO = 0.12
+PROP_COORD_AUSENTE = 0.03
+PROP_BAIRRO_AUSENTE = 0.03
+PROP_LOGRADOURO_AUSENTE = 0.02
+PROP_NUMERO_SN = 0.18
+PROP_NUMERO_AUSENTE = 0.02
+
+def pesos(valores):
+    valores = np.asarray(valores, dtype=float)
+    return valores / valores.sum()
+
+def zipf_codigos(rng, n, tamanho, expoente):
+    """Códigos em [0, tamanho) com frequência decrescente (lei de potência)"""
+    probs = pesos(1.0 / np.arange(1, tamanho + 1) ** expoente)
+    return rng.choice(tamanho, size=n, p=probs)
+
+def rotulos(rng, prefixos, tamanho, fmt):
+    """Conjunto de rótulos distintos no formato `fmt` (prefixo, nome, número)"""
+    prefixo = rng.choice(prefixos, tamanho)
+    nome = rng.choice(NOMES, tamanho)
+    return np.array([fmt.format(p, m, i) for i, (p, m) in enumerate(zip(prefixo, nome))], dtype=object)
+
+def construir_dominios(rng, n_total):
+    """Valores de cada dimensão; bairros e logradouros crescem com o volume, como no dado real"""
+    municipios = [nome for nome, _, _ in MUNICIPIOS_PRINCIPAIS]
+    municipios += [f'MUNICIPIO {i:03d}' for i in range(len(municipios), TOTAL_MUNICIPIOS)]
+    centros = np.array([(lat, lon) for _, lat, lon in MUNICIPIOS_PRINCIPAIS])
+    extras = np.column_stack([
+        rng.uniform(-25.0, -20.0, TOTAL_MUNICIPIOS - len(centros)),
+        rng.uniform(-53.0, -44.5, TOTAL_MUNICIPIOS - len(centros))
+    ])
+
+    n_bairros = int(np.clip(n_total // 50, 500, 30_000))
+    n_logradouros = int(np.clip(n_total // 8, 2_000, 600_000))
+    return {
+        'municipios': np.array(municipios, dtype=object),
+        'centros': np.vstack([centros, extras]),
+        'bairros': rotulos(rng, PREFIXOS_BAIRRO, n_bairros, '{} {} {}'),
+        'logradouros': rotulos(rng, PREFIXOS_LOGRADOURO, n_logradouros, '{} {} {}'),
+        'naturezas': np.array([nome for nome, _, _ in NATUREZAS], dtype=object),
+        'naturezas_pesos': pesos([peso for _, peso, _ in NATUREZAS]),
+        'rubricas': [np.array(rubricas, dtype=object) for _, _, rubricas in NATUREZAS],
+        'locais': np.array([nome for nome, _ in LOCAIS], dtype=object),
+        'locais_pesos': pesos([peso for _, peso in LOCAIS]),
+        'condutas': np.array([nome for nome, _ in CONDUTAS], dtype=object),
+        'condutas_pesos': pesos([peso for _, peso in CONDUTAS]),
+    }
+
+def delegacias(municipio_codigos, municipios, rng):
+    """Delegacia da circunscrição: várias DPs numeradas nos maiores municípios, uma nos demais"""
+    n_dps = np.maximum(1, 100 // (municipio_codigos + 1))
+    dp = (rng.random(len(municipio_codigos)) ** 2 * n_dps).astype(int) + 1
+    nomes = municipios[municipio_codigos]
+    return np.where(
+        n_dps > 1,
+        np.array([f'{i:02d}º D.P. ' for i in range(101)], dtype=object)[dp] + nomes,
+        'DEL.POL.' + nomes
+    )
+
+HORAS_TEXTO = np.array([f'{h:02d}:{m:02d}:00' for h in range(24) for m in range(60)], dtype=object)
+
+def horas(rng, n):
+    """Horas HH:MM:SS com pico no fim da tarde, minutos arredondados e ausentes"""
+    perfil = pesos([3, 2, 2, 1.5, 1.5, 2, 3, 4, 5, 5, 5, 5, 6, 5, 5, 5, 6, 7, 8, 8, 7, 6, 5, 4])
+    hora = rng.choice(24, size=n, p=perfil)
+    minuto = np.where(rng.random(n) < 0.5, 0, rng.integers(0, 60, n))
+    texto = HORAS_TEXTO[hora * 60 + minuto]
+    sorteio = rng.random(n)
+    texto[sorteio < PROP_HORA_AUSENTE] = None
+    texto[(sorteio >= PROP_HORA_AUSENTE) & (sorteio < PROP_HORA_AUSENTE + PROP_HORA_INVALIDA)] = '99:99'
+    return texto
+
+def gerar_lote(rng, n, dominios):
+    """Gera `n` linhas no esquema do CSV"""
+    municipio = zipf_codigos(rng, n, TOTAL_MUNICIPIOS, 1.3)
+    natureza = rng.choice(len(NATUREZAS), size=n, p=dominios['naturezas_pesos'])
+    rubrica = np.empty(n, dtype=object)
+    for codigo, opcoes in enumerate(dominios['rubricas']):
+        linhas = np.flatnonzero(natureza == codigo)
+        rubrica[linhas] = opcoes[rng.integers(0, len(opcoes), len(linhas))]
+
+    # Recorte por data de registro (como os arquivos da SSP); ocorrência no mesmo dia
+    # na maioria dos casos, com cauda longa de atraso
+    registro = INICIO + rng.integers(0, DIAS, n).astype('timedelta64[D]')
+    atraso = np.minimum(rng.geometric(0.45, n) - 1 + (rng.random(n) < 0.03) * rng.integers(10, 400, n), 2000)
+    ocorrencia = registro - atraso.astype('timedelta64[D]')
+
+    bairro = dominios['bairros'][zipf_codigos(rng, n, len(dominios['bairros']), 1.05)]
+    bairro[rng.random(n) < PROP_BAIRRO_AUSENTE] = None
+    logradouro = dominios['logradouros'][zipf_codigos(rng, n, len(dominios['logradouros']), 0.9)]
+    logradouro[rng.random(n) < PROP_LOGRADOURO_AUSENTE] = None
+
+    numero = np.round(rng.lognormal(5.0, 1.3, n)).astype(float)
+    sorteio = rng.random(n)
+    numero[sorteio < PROP_NUMERO_SN] = 0
+    numero[sorteio > 1 - PROP_NUMERO_AUSENTE] = np.nan
+
+    centro = dominios['centros'][municipio]
+    latitude = np.round(centro[:, 0] + rng.normal(0, 0.04, n), 6)
+    longitude = np.round(centro[:, 1] + rng.normal(0, 0.04, n), 6)
+    sorteio = rng.random(n)
+    sem_coordenada = sorteio < PROP_COORD_ZERO
+    latitude[sem_coordenada] = 0
+    longitude[sem_coordenada] = 0
+    ausente = (sorteio >= PROP_COORD_ZERO) & (sorteio < PROP_COORD_ZERO + PROP_COORD_AUSENTE)
+    latitude[ausente] = np.nan
+    longitude[ausente] = np.nan
+
+    local = rng.choice(len(LOCAIS), size=n, p=dominios['locais_pesos'])
+    conduta = rng.choice(len(CONDUTAS), size=n, p=dominios['condutas_pesos'])
+    ocorrencia = pd.DatetimeIndex(ocorrencia)
+
+    return pd.DataFrame({
+        'NOME_MUNICIPIO_CIRCUNSCRIÇÃO': dominios['municipios'][municipio],
+        'NOME_DELEGACIA_CIRCUNSCRIÇÃO': delegacias(municipio, dominios['municipios'], rng),
+        'DATA_REGISTRO': pd.DatetimeIndex(registro).strftime('%d/%m/%Y'),
+        'DATA_OCORRENCIA_BO': ocorrencia.strftime('%Y-%m-%d'),
+        'HORA_OCORRENCIA_BO': horas(rng, n),
+        'DESCR_SUBTIPOLOCAL': dominios['locais'][local],
+        'BAIRRO': bairro,
+        'LOGRADOURO': logradouro,
+        'NUMERO_LOGRADOURO': numero,
+        'LATITUDE': latitude,
+        'LONGITUDE': longitude,
+        'NATUREZA_APURADA': dominios['naturezas'][natureza],
+        'RUBRICA': rubrica,
+        'DESCR_CONDUTA': dominios['condutas'][conduta],
+        'MES_ANO': ocorrencia.strftime('%Y-%m'),
+    }, columns=COLUNAS)
+
+def gerar_dados(n, semente=0):
+    """DataFrame sintético com `n` linhas (em memória)"""
+    rng = np.random.default_rng(semente)
+    dominios = construir_dominios(rng, n)
+    return pd.concat([gerar_lote(rng, min(LOTE, n - inicio), dominios) for inicio in range(0, n, LOTE)],
+                     ignore_index=True)
+
+def gravar_csv(n, path, semente=0):
+    """Grava `n` linhas sintéticas em `path` por lotes, sem manter o conjunto inteiro em memória"""
+    rng = np.random.default_rng(semente)
+    dominios = construir_dominios(rng, n)
+    for inicio in range(0, n, LOTE):
+        lote = gerar_lote(rng, min(LOTE, n - inicio), dominios)
+        lote.to_csv(path, index=False, mode='w' if inicio == 0 else 'a', header=inicio == 0)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('linhas', type=int)
+    parser.add_argument('saida')
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+    gravar_csv(args.linhas, args.saida, args.semente)
+
+if __name__ == '__main__':
+    main()